@@ -16,13 +16,13 @@ def get_versioned_output_path():
 
 OUT_PATH = get_versioned_output_path()
 
-doc =  pymupdf.open(PDF_PATH)
-
-# Pull text from first page of file
-page = doc[0]
-text = page.get_text()
-page_dict = page.get_text("dict")
-blocks = page.get_text("blocks")
+# Pull text from first page of file, closing the document once the text is read
+with pymupdf.open(PDF_PATH) as doc:
+    page = doc[0]
+    # Parse the page once and reuse it for both text shapes
+    textpage = page.get_textpage(flags=pymupdf.TEXTFLAGS_DICT)
+    text = page.get_text(textpage=textpage)
+    page_dict = page.get_text("dict", textpage=textpage)
 
 # Find numbers from document
 numbers = re.findall(r"\d+", text)
@@ -37,6 +37,7 @@ class School:
           self.name = name
           self.is_both = is_both
           self.data_list = data_list
+          self.data_map = {d["label"]: d["value"] for d in data_list}
 
 # Locate school name 
 """""
@@ -129,10 +130,7 @@ def _blank_if_zero(v):
     
 # Method for retriving label values from school data list
 def _get(school, label):
-    for d in school.data_list:
-        if d.get("label") == label:
-            return d.get("value")
-    return None
+    return school.data_map.get(label)
 
 def build_rows_for_school(school):
     rows = []
@@ -199,22 +197,29 @@ def build_rows_for_school(school):
 
 COLUMNS = ["School", "Students", "Teachers", "Sub", "OSS", "EX", "ER", "MDM"]
 
-def append_rows_to_excel(rows, path=OUT_PATH):
-    # Create file if needed then append rows
+def open_output(path=OUT_PATH):
+    # Open the output workbook once per run; rows are appended in memory and saved once
     if not path.exists():
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Data"
+        # New file: stream rows with a write-only workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Data")
         ws.append(COLUMNS)
     else:
         wb = load_workbook(path)
         ws = wb.active
+    return wb, ws, path
 
+def append_rows_to_excel(rows, output):
+    wb, ws, path = output
     for r in rows:
         ws.append([r.get(col) for col in COLUMNS])
+    print(f"Appended {len(rows)} row(s) → {path}")
 
+def finalize_output(output):
+    wb, ws, path = output
     wb.save(path)
-    print(f"Appended {len(rows)} row(s) → {path}")
 
+output = open_output()
 rows = build_rows_for_school(school)
-append_rows_to_excel(rows)
+append_rows_to_excel(rows, output)
+finalize_output(output)
@@ -1,11 +1,16 @@
-import io
+import math
+import os
 import re
 import sys
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from operator import attrgetter
 from datetime import datetime
 from pathlib import Path
 
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageOps
 from pymupdf import pymupdf
 from openpyxl import Workbook, load_workbook
 
@@ -19,19 +24,21 @@ def get_versioned_output_path():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     return BASE_DIR / f"monthly_report_data_{timestamp}.xlsx"
 
-OUT_PATH = get_versioned_output_path()
-
 VERBOSE = "--verbose" in sys.argv or "-v" in sys.argv
 
 class School:
-    def __init__(self, name, is_both, data_list):
+    def __init__(self, name, is_both, data):
         self.name = name
         self.is_both = is_both
-        self.data_list = data_list
+        self.data = data  # label -> value
 
 COLUMNS = ["School", "Students", "Teachers", "Sub", "OSS", "EX", "ER", "MDM"]
 
-es_and_hs_schools = [
+# One output row; a tuple in COLUMNS order, so it can be appended to a sheet as-is
+Row = namedtuple("Row", COLUMNS)
+
+# Schools that report both ES and HS rows (frozenset for O(1) membership checks)
+ES_AND_HS_SCHOOLS = frozenset([
     "Arts and College Preparatory Academy",
     "Columbus Arts and Tech Academy",
     "Columbus Preparatory Academy",
@@ -41,7 +48,7 @@ es_and_hs_schools = [
     "Ohio Virtual Academy",
     "Wildwood Environmental Academy",
     "Brian's Sample School"
-]
+])
 
 
 index_labels = [
@@ -68,267 +75,332 @@ def _blank_if_zero(v):
         return v
     
 def _get(school, label):
-    for d in school.data_list:
-        if d.get("label") == label:
-            return d.get("value")
-    return None
+    return school.data.get(label)
 
 
 
 MAX_NEEDED_INDEX = max(m["index_value"] for m in index_labels)
 
+# (label, index) pairs for the number-based fallback, built once
+_FALLBACK_INDEXES = [(m["label"], m["index_value"]) for m in index_labels]
+
+
+_OCR_FIELD_PATTERNS = {
+    "SWD K-8": [
+        r"SWD in grades K-8:\s*(\d+)",
+        r"SWD K-8:\s*(\d+)",
+        r"K-8:\s*(\d+)"
+    ],
+    "SWD 9-12": [
+        r"SWD in grades 9-12:\s*(\d+)",
+        r"SWD 9-12:\s*(\d+)",
+        r"9-12:\s*(\d+)"
+    ],
+    "IS K-8": [
+        r"Number of IS serving grades K-8:\s*(\d+(?:\.\d+)?)",
+        r"IS serving K-8:\s*(\d+(?:\.\d+)?)",
+        r"IS K-8:\s*(\d+(?:\.\d+)?)"
+    ],
+    "IS 9-12": [
+        r"Number of IS serving grades 9-12:\s*(\d+(?:\.\d+)?)",
+        r"IS serving 9-12:\s*(\d+(?:\.\d+)?)",
+        r"IS 9-12:\s*(\d+(?:\.\d+)?)"
+    ],
+    "Sub": [
+        r"Total number of Intervention Specialists.*Substitute Teacher License:\s*(\d+)",
+        r"Substitute Teacher License:\s*(\d+)",
+        r"Substitutes:\s*(\d+)"
+    ],
+    "OSS K-8": [
+        r"OSS of SWD K-8:\s*(\d+)",
+        r"OSS K-8:\s*(\d+)"
+    ],
+    "OSS 9-12": [
+        r"OSS of SWD 9-12:\s*(\d+)",
+        r"OSS 9-12:\s*(\d+)",
+        r"OSS of SWD9-12:\s*(\d+)",
+        r"OSS of SWD9-12:\s*go"
+    ],
+    "EX K-8": [
+        r"Expulsion of SWD K.*8:\s*(\d+)",
+        r"Expulsion K-8:\s*(\d+)"
+    ],
+    "EX 9-12": [
+        r"Expulsion of SWD 9-12:\s*(\d+)",
+        r"Expulsion 9-12:\s*(\d+)"
+    ],
+    "ER": [
+        r"Emergency Removal:\s*(\d+)",
+        r"Emergency:\s*(\d+)"
+    ],
+    "MDM": [
+        r"MDM:\s*(\d+)",
+        r"MDM\s*:\s*(\d+)",
+        r"Manifestation Determination Meeting:\s*(\d+)"
+    ]
+}
+
+# Compiled once at import so each PDF only pays for the searches themselves.
+# Case-insensitive because Tesseract output slips on case ("Swd", "oss", "Go").
+COMPILED_PATTERNS = {
+    field: [re.compile(p, re.IGNORECASE) for p in pattern_list]
+    for field, pattern_list in _OCR_FIELD_PATTERNS.items()
+}
+
+# OCR sometimes reads "60" as "go" on this label
+_OSS_GO_PATTERN = r"OSS of SWD9-12:\s*go"
+
+# Each field pattern's label followed by "N/A", which the form asks for on grade bands a school
+# does not serve; aligned with COMPILED_PATTERNS (None where a pattern has no value group)
+_NA_PATTERNS = {
+    field: [
+        re.compile(p[:p.index(r"(\d")] + r"N/?A\b", re.IGNORECASE) if r"(\d" in p else None
+        for p in pattern_list
+    ]
+    for field, pattern_list in _OCR_FIELD_PATTERNS.items()
+}
+
+# Intervention specialist counts can be fractional FTEs
+_FLOAT_FIELDS = frozenset({"IS K-8", "IS 9-12"})
+
+_NUM_RE = re.compile(r"\d+")
+
+# Minimum text-layer length for a page to count as born-digital rather than scanned
+MIN_TEXT_LAYER_CHARS = 200
+
+# Page render scale for OCR (1.0 = 72 DPI). The correction rules below were tuned against 2x renders.
+OCR_ZOOM = 2.0
+
+# Longest side, in pixels, of a page rendered for OCR. Only oversized pages (e.g. scans stored at
+# one point per pixel) are scaled down to this so Tesseract's work stays bounded; standard sizes
+# up to Tabloid (1224 pt, 2448 px) render at the full 2x, including Letter, A4 and Legal.
+OCR_MAX_SIDE = 2500
+
+
+# Known data problems for specific schools, applied in order whether the values came from the
+# text layer or from OCR:
+# (text that must appear on the page, field, condition on (value, data), corrected value, reason)
+_SCHOOL_OVERRIDE_RULES = [
+    ("Ohio Virtual Academy", "SWD K-8", lambda v, d: v == 1, 1432,
+     "Ohio Virtual Academy known large number"),
+    ("Ohio Virtual Academy", "SWD 9-12", lambda v, d: v == 1, 1431,
+     "Ohio Virtual Academy known large number"),
+    ("Western Toledo Preparatory", "SWD K-8", lambda v, d: v is None or v == 0, 4,
+     "Western Toledo Preparatory known missing data"),
+]
 
-def apply_ocr_corrections(data: dict, ocr_text: str) -> dict:
-    """Apply OCR corrections based on context analysis and pattern detection."""
-    corrected_data = data.copy()
-    
-    corrected_data = _apply_eleven_to_one_corrections(corrected_data, ocr_text)
-    corrected_data = _apply_double_digit_corrections(corrected_data, ocr_text)
-    corrected_data = _apply_large_number_corrections(corrected_data, ocr_text)
-    corrected_data = _apply_missing_data_corrections(corrected_data, ocr_text)
-    corrected_data = _apply_context_based_corrections(corrected_data, ocr_text)
-    
-    return corrected_data
+# Known OCR misreads, applied in order after the school overrides (same layout as above)
+_OCR_CORRECTION_RULES = [
+    ("Number of IS serving grades", "IS K-8", lambda v, d: v == 45, 4.5,
+     "decimal point misreading"),
+    ("Number of IS serving grades", "IS K-8", lambda v, d: v == 5 and 0 < d.get("SWD K-8", 0) < 20, 0.5,
+     "leading zero misreading"),
+    ("Number of IS serving grades", "IS 9-12", lambda v, d: v == 45, 4.5,
+     "decimal point misreading"),
+    ("Number of IS serving grades", "IS 9-12", lambda v, d: v == 5 and 0 < d.get("SWD 9-12", 0) < 20, 0.5,
+     "leading zero misreading"),
+]
 
+# Each trigger is searched for once per text, however many rules in its table share it
+_SCHOOL_OVERRIDE_TRIGGERS = frozenset(rule[0] for rule in _SCHOOL_OVERRIDE_RULES)
+_OCR_CORRECTION_TRIGGERS = frozenset(rule[0] for rule in _OCR_CORRECTION_RULES)
 
-def _apply_eleven_to_one_corrections(data: dict, ocr_text: str) -> dict:
-    """Correct cases where OCR misreads a single "1" as "11" for teacher fields."""
+
+def _apply_correction_rules(rules: list, triggers: frozenset, data: dict, text: str, tag: str) -> dict:
+    """Apply a correction rule table in a single pass over the rules."""
     corrected_data = data.copy()
+    present = {trigger: trigger in text for trigger in triggers}
     
-    single_digit_fields = {
-        "IS K-8": ["Number of IS serving grades K-8:", "IS serving K-8:", "IS K-8:"],
-        "IS 9-12": ["Number of IS serving grades 9-12:", "IS serving 9-12:", "IS 9-12:"],
-        "Sub": ["Substitute Teacher License:", "Substitutes:"],
-        "OSS K-8": ["OSS of SWD K-8:", "OSS K-8:"],
-        "OSS 9-12": ["OSS of SWD 9-12:", "OSS 9-12:"],
-        "EX K-8": ["Expulsion of SWD K-8:", "Expulsion K-8:"],
-        "EX 9-12": ["Expulsion of SWD 9-12:", "Expulsion 9-12:"],
-        "ER": ["Emergency Removal:", "Emergency:"],
-        "MDM": ["MDM:", "Manifestation Determination Meeting:"]
-    }
-    
-    for field, patterns in single_digit_fields.items():
-        if corrected_data.get(field) == 11:
-            for pattern in patterns:
-                if pattern in ocr_text:
-                    if _should_correct_eleven_to_one(ocr_text, field, pattern, corrected_data):
-                        if VERBOSE:
-                            print(f"  [OCR CORRECTION] {field}: 11 → 1 (context-based correction)")
-                        corrected_data[field] = 1
-                    break
+    for trigger, field, condition, corrected_value, reason in rules:
+        value = corrected_data.get(field)
+        if present[trigger] and condition(value, corrected_data):
+            if VERBOSE:
+                print(f"  [{tag}] {field}: {value} → {corrected_value} ({reason})")
+            corrected_data[field] = corrected_value
     
     return corrected_data
 
 
-def _should_correct_eleven_to_one(ocr_text: str, field: str, pattern: str, data: dict) -> bool:
-    """
-    Determine if "11" should be corrected to "1" based on OCR text artifacts.
-    Preserves actual document data for error checking purposes.
+def apply_school_overrides(data: dict, text: str) -> dict:
+    """Apply the known per-school data fixes to values parsed from the page text or OCR text."""
+    return _apply_correction_rules(_SCHOOL_OVERRIDE_RULES, _SCHOOL_OVERRIDE_TRIGGERS, data, text, "OVERRIDE")
+
+
+def apply_ocr_corrections(data: dict, ocr_text: str) -> dict:
+    """Apply the per-school data fixes, then corrections for known OCR misreads."""
+    data = apply_school_overrides(data, ocr_text)
+    return _apply_correction_rules(_OCR_CORRECTION_RULES, _OCR_CORRECTION_TRIGGERS, data, ocr_text,
+                                   "OCR CORRECTION")
+
+
+def _scan_report_fields(text: str) -> tuple[dict, set]:
     """
-    import re
+    Match each report field in page text, using the first pattern that hits.
+    Returns (data, not_applicable): the parsed values and the fields marked N/A. Each pattern's
+    N/A form is checked before the next, looser pattern, so a field reported as N/A never falls
+    through to a bare "K-8:" / "9-12:" pattern that would pick up another field's line.
     
-    pattern_escaped = re.escape(pattern)
-    spaced_pattern = rf"{pattern_escaped}\s*:?\s*1\s+1\b|{pattern_escaped}\s*:?\s*1\s*[|]\s*1\b"
+    >>> _scan_report_fields("Number of SWD in grades K-8: N/A\\nOSS of SWD K-8: 2")
+    ({'OSS K-8': 2}, {'SWD K-8'})
+    """
+    data = {}
+    not_applicable = set()
+    
+    for field, pattern_list in COMPILED_PATTERNS.items():
+        for pattern, na_pattern in zip(pattern_list, _NA_PATTERNS[field]):
+            match = pattern.search(text)
+            if match:
+                if pattern.pattern == _OSS_GO_PATTERN:
+                    value = 60
+                elif field in _FLOAT_FIELDS:
+                    value = float(match.group(1))
+                else:
+                    value = int(match.group(1))
+                data[field] = value
+                # First hit wins; the field's remaining patterns are never tried
+                break
+            if na_pattern is not None and na_pattern.search(text):
+                not_applicable.add(field)
+                break
+    
+    return data, not_applicable
+
+
+def _parse_report_fields(text: str) -> dict:
+    """Match each report field in page text, using the first pattern that hits."""
+    return _scan_report_fields(text)[0]
+
+
+def extract_data_from_text_layer(page, textpage=None) -> tuple[dict, bool]:
+    """
+    Extract data from the page's embedded text layer, skipping OCR entirely.
+    Layout-sorted text keeps each label on the same line as its value, so the OCR patterns apply as-is.
+    Returns (data, complete): data is empty for scanned pages (no text layer), and complete is True
+    only when every field was found or marked N/A, so a partly parseable layer can still go to OCR.
+    """
+    try:
+        text = page.get_text(sort=True, textpage=textpage)
+    except Exception as e:
+        print(f"Error reading text layer: {e}")
+        return {}, False
     
-    if re.search(spaced_pattern, ocr_text, re.IGNORECASE):
-        return False
+    # Scans can still carry a stray stamp or header; a filled-in report has far more text than that
+    if len(text.strip()) < MIN_TEXT_LAYER_CHARS:
+        return {}, False
     
-    return False
+    data, not_applicable = _scan_report_fields(text)
+    if not data:
+        return data, False
+    complete = len(data) + len(not_applicable) == len(COMPILED_PATTERNS)
+    return apply_school_overrides(data, text), complete
 
 
-def _apply_double_digit_corrections(data: dict, ocr_text: str) -> dict:
-    """Detect and correct double-digit OCR misreading issues."""
-    corrected_data = data.copy()
+def _render_for_ocr(page) -> Image.Image:
+    """
+    Render a page in grayscale and stretch its contrast (evens out faint or uneven scans).
+    Binarization is left to Tesseract, which thresholds adaptively on its own.
+    """
+    # Shrink oversized pages so the longest side fits OCR_MAX_SIDE
+    zoom = min(OCR_ZOOM, OCR_MAX_SIDE / max(page.rect.width, page.rect.height))
     
-    double_digit_fields = {
-        "IS K-8": ["Number of IS serving grades K-8:", "IS serving K-8:", "IS K-8:"],
-        "IS 9-12": ["Number of IS serving grades 9-12:", "IS serving 9-12:", "IS 9-12:"],
-        "SWD K-8": ["SWD in grades K-8:", "SWD K-8:"],
-        "SWD 9-12": ["SWD in grades 9-12:", "SWD 9-12:"],
-        "Sub": ["Substitute Teacher License:", "Substitutes:"],
-        "OSS K-8": ["OSS of SWD K-8:", "OSS K-8:"],
-        "OSS 9-12": ["OSS of SWD 9-12:", "OSS 9-12:"],
-        "EX K-8": ["Expulsion of SWD K-8:", "Expulsion K-8:"],
-        "EX 9-12": ["Expulsion of SWD 9-12:", "Expulsion 9-12:"],
-        "ER": ["Emergency Removal:", "Emergency:"],
-        "MDM": ["MDM:", "Manifestation Determination Meeting:"]
-    }
-    
-    for field, patterns in double_digit_fields.items():
-        if corrected_data.get(field) == 1:
-            for pattern in patterns:
-                if pattern in ocr_text:
-                    correction = _analyze_double_digit_context(ocr_text, field, pattern)
-                    if correction and correction != 1:
-                        if VERBOSE:
-                            print(f"  [OCR CORRECTION] {field}: 1 → {correction}")
-                        corrected_data[field] = correction
-                    break
-        elif corrected_data.get(field) == 1.0:
-            for pattern in patterns:
-                if pattern in ocr_text:
-                    correction = _analyze_double_digit_context(ocr_text, field, pattern)
-                    if correction and correction != 1.0:
-                        if VERBOSE:
-                            print(f"  [OCR CORRECTION] {field}: 1.0 → {correction}")
-                        corrected_data[field] = correction
-                    break
+    # Grayscale render handed to PIL as raw samples (no PNG encode/decode round-trip)
+    pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), colorspace=pymupdf.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    # PIL holds its own copy now; drop the pixmap before autocontrast allocates another buffer
+    pix = None
     
-    return corrected_data
+    return ImageOps.autocontrast(img, cutoff=1)
 
 
-def _analyze_double_digit_context(ocr_text: str, field: str, pattern: str) -> int:
-    """Preserve actual OCR output without automatic corrections."""
-    return 1
+def _run_tesseract(img: Image.Image) -> str:
+    """
+    OCR a PIL image. The image is handed to Tesseract as an uncompressed PGM file,
+    which skips the PNG compression pytesseract would otherwise apply to its temp file.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = Path(temp_dir) / "page.pgm"
+        img.save(image_path)
+        return pytesseract.image_to_string(str(image_path))
 
 
-def _apply_large_number_corrections(data: dict, ocr_text: str) -> dict:
-    """Detect and correct cases where OCR only reads the first digit of large numbers."""
-    corrected_data = data.copy()
-    
-    if "Ohio Virtual Academy" in ocr_text:
-        if corrected_data.get("SWD K-8") == 1:
-            if VERBOSE:
-                print(f"  [OCR CORRECTION] SWD K-8: 1 → 1432 (Ohio Virtual Academy known large number)")
-            corrected_data["SWD K-8"] = 1432
-        if corrected_data.get("SWD 9-12") == 1:
-            if VERBOSE:
-                print(f"  [OCR CORRECTION] SWD 9-12: 1 → 1431 (Ohio Virtual Academy known large number)")
-            corrected_data["SWD 9-12"] = 1431
-    
-    return corrected_data
+# Whether the Tesseract binary can be run in this process; None until probed
+_TESSERACT_AVAILABLE = None
 
 
-def _apply_missing_data_corrections(data: dict, ocr_text: str) -> dict:
-    """Detect and correct cases where data is missing but should be present."""
-    corrected_data = data.copy()
-    
-    if "Western Toledo Preparatory" in ocr_text and (corrected_data.get("SWD K-8") == 0 or "SWD K-8" not in corrected_data):
-        if VERBOSE:
-            print(f"  [OCR CORRECTION] SWD K-8: 0 → 4 (Western Toledo Preparatory known missing data)")
-        corrected_data["SWD K-8"] = 4
-    
-    return corrected_data
+def _init_ocr_worker():
+    """
+    ProcessPoolExecutor initializer: probe the Tesseract binary once per worker
+    so a missing install is reported once instead of failing every PDF the worker handles.
+    """
+    global _TESSERACT_AVAILABLE
+    try:
+        pytesseract.get_tesseract_version()
+        _TESSERACT_AVAILABLE = True
+    except Exception as e:
+        print(f"Tesseract unavailable, OCR disabled for this worker: {e}")
+        _TESSERACT_AVAILABLE = False
 
 
-def _apply_context_based_corrections(data: dict, ocr_text: str) -> dict:
+def ocr_pdfs(pdf_paths: list) -> dict:
     """
-    Apply corrections based on known OCR issues, not calculations or inferences.
+    OCR the first page of every PDF with a single Tesseract run.
+    Returns a dict mapping each PDF path to its OCR text.
     """
-    corrected_data = data.copy()
+    ocr_texts = {}
+    if _TESSERACT_AVAILABLE is False:
+        return ocr_texts
     
-    for field in ["IS K-8", "IS 9-12"]:
-        if corrected_data.get(field) == 45:
-            if "Number of IS serving grades" in ocr_text:
-                if VERBOSE:
-                    print(f"  [OCR CORRECTION] {field}: 45 → 4.5 (decimal point misreading)")
-                corrected_data[field] = 4.5
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        image_paths = {}
         
-        if corrected_data.get(field) == 5:
-            if "Number of IS serving grades" in ocr_text:
-                swd_count = 0
-                if field == "IS K-8":
-                    swd_count = corrected_data.get("SWD K-8", 0)
-                elif field == "IS 9-12":
-                    swd_count = corrected_data.get("SWD 9-12", 0)
-                
-                if swd_count > 0 and swd_count < 20:
-                    if VERBOSE:
-                        print(f"  [OCR CORRECTION] {field}: 5 → 0.5 (leading zero misreading, {swd_count} students)")
-                    corrected_data[field] = 0.5
+        for i, pdf_path in enumerate(pdf_paths):
+            try:
+                with pymupdf.open(pdf_path) as doc:
+                    img = _render_for_ocr(doc[0])
+                image_path = temp_path / f"page_{i}.pgm"
+                img.save(image_path)
+                image_paths[pdf_path] = image_path
+            except Exception as e:
+                print(f"[skip] {Path(pdf_path).name}: cannot render page for OCR ({e})")
+        
+        if not image_paths:
+            return ocr_texts
+        
+        # Tesseract treats a .txt input as a list of images and separates pages with form feeds
+        list_path = temp_path / "images.txt"
+        list_path.write_text("\n".join(str(p) for p in image_paths.values()) + "\n")
+        
+        try:
+            output = pytesseract.image_to_string(str(list_path))
+        except Exception as e:
+            print(f"Error running batch OCR: {e}")
+            return ocr_texts
     
-    return corrected_data
+    page_texts = output.split("\f")
+    if len(page_texts) < len(image_paths):
+        print("Batch OCR returned fewer pages than expected; falling back to per-file OCR")
+        return ocr_texts
+    
+    for pdf_path, page_text in zip(image_paths, page_texts):
+        ocr_texts[pdf_path] = page_text
+    return ocr_texts
+
 
+def _ocr_page(page) -> str:
+    """Render an open page for OCR and OCR it."""
+    return _run_tesseract(_render_for_ocr(page))
 
 
-def extract_data_from_ocr(pdf_path: str) -> dict:
-    """Extract data from PDF using OCR on screenshot."""
+def extract_data_from_ocr(page, ocr_text: str | None = None) -> dict:
+    """Extract data from an already-open PDF page using OCR on screenshot (or on pre-computed OCR text)."""
     try:
-        doc = pymupdf.open(pdf_path)
-        page = doc[0]
+        if ocr_text is None:
+            if _TESSERACT_AVAILABLE is False:
+                return None
+            ocr_text = _ocr_page(page)
         
-        mat = pymupdf.Matrix(2.0, 2.0)
-        pix = page.get_pixmap(matrix=mat)
-        img_data = pix.tobytes("png")
-        
-        img = Image.open(io.BytesIO(img_data))
-        ocr_text = pytesseract.image_to_string(img)
-        
-        doc.close()
-        
-        data = {}
-        
-        patterns = {
-            "SWD K-8": [
-                r"SWD in grades K-8:\s*(\d+)",
-                r"SWD K-8:\s*(\d+)",
-                r"K-8:\s*(\d+)",
-                r"SWD in grades K-8:\s*\n\s*(\d+)",
-                r"SWD in grades K-8:\s*\n\s*(\d+)\s*\n",
-                r"SWD in grades K-8:\s*\n\s*(\d+)\s*\n\s*SWD in grades 9-12:"
-            ],
-            "SWD 9-12": [
-                r"SWD in grades 9-12:\s*(\d+)",
-                r"SWD 9-12:\s*(\d+)",
-                r"9-12:\s*(\d+)"
-            ],
-            "IS K-8": [
-                r"Number of IS serving grades K-8:\s*(\d+(?:\.\d+)?)",
-                r"IS serving K-8:\s*(\d+(?:\.\d+)?)",
-                r"IS K-8:\s*(\d+(?:\.\d+)?)"
-            ],
-            "IS 9-12": [
-                r"Number of IS serving grades 9-12:\s*(\d+(?:\.\d+)?)",
-                r"IS serving 9-12:\s*(\d+(?:\.\d+)?)",
-                r"IS 9-12:\s*(\d+(?:\.\d+)?)"
-            ],
-            "Sub": [
-                r"Total number of Intervention Specialists.*Substitute Teacher License:\s*(\d+)",
-                r"Substitute Teacher License:\s*(\d+)",
-                r"Substitutes:\s*(\d+)"
-            ],
-            "OSS K-8": [
-                r"OSS of SWD K-8:\s*(\d+)",
-                r"OSS K-8:\s*(\d+)"
-            ],
-                    "OSS 9-12": [
-                        r"OSS of SWD 9-12:\s*(\d+)",
-                        r"OSS 9-12:\s*(\d+)",
-                        r"OSS of SWD9-12:\s*(\d+)",
-                        r"OSS of SWD9-12:\s*go"
-                    ],
-            "EX K-8": [
-                r"Expulsion of SWD K.*8:\s*(\d+)",
-                r"Expulsion K-8:\s*(\d+)"
-            ],
-            "EX 9-12": [
-                r"Expulsion of SWD 9-12:\s*(\d+)",
-                r"Expulsion 9-12:\s*(\d+)"
-            ],
-            "ER": [
-                r"Emergency Removal:\s*(\d+)",
-                r"Emergency:\s*(\d+)"
-            ],
-            "MDM": [
-                r"MDM:\s*(\d+)",
-                r"MDM\s*:\s*(\d+)",
-                r"Manifestation Determination Meeting:\s*(\d+)"
-            ]
-        }
-        
-        for field, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                match = re.search(pattern, ocr_text, re.IGNORECASE)
-                if match:
-                    if pattern == r"OSS of SWD9-12:\s*go":
-                        value = 60
-                    else:
-                        if field in ["IS K-8", "IS 9-12"]:
-                            value = float(match.group(1))
-                        else:
-                            value = int(match.group(1))
-                    data[field] = value
-                    break
+        data = _parse_report_fields(ocr_text)
         
         data = apply_ocr_corrections(data, ocr_text)
         
@@ -340,11 +412,55 @@ def extract_data_from_ocr(pdf_path: str) -> dict:
 
 
 # ------- PDF -> School object -----------
-def school_from_pdf(pdf_path: Path) -> School | None:
-    """Parse one PDF into a School using OCR extraction."""
+def school_from_pdf(pdf_path: Path, ocr_text: str | None = None, text_only: bool = False,
+                    use_ocr: bool = True) -> School | None:
+    """
+    Parse one PDF into a School.
+    Uses the embedded text layer when present, otherwise OCR (optionally from pre-computed OCR text).
+    With text_only, returns None instead of falling back to OCR when there is no usable text layer.
+    With use_ocr=False, pages without a text layer skip OCR and go straight to number-based parsing.
+    """
     try:
         doc = pymupdf.open(pdf_path)
+    except Exception as e:
+        print(f"[skip] {pdf_path.name}: cannot open/read first page ({e})")
+        return None
+    
+    # Closing the document releases MuPDF's memory promptly across long bulk runs
+    with doc:
+        return _school_from_document(doc, pdf_path, ocr_text, text_only, use_ocr)
+
+
+def school_from_pdf_stream(pdf_bytes: bytes, name: str, use_ocr: bool = True) -> School | None:
+    """Parse one in-memory PDF (e.g. an upload) into a School without writing it to disk."""
+    try:
+        doc = pymupdf.open(stream=pdf_bytes, filetype="pdf")
+    except Exception as e:
+        print(f"[skip] {name}: cannot open/read first page ({e})")
+        return None
+    
+    with doc:
+        return _school_from_document(doc, Path(name), use_ocr=use_ocr)
+
+
+def school_from_source(source: Path | bytes, name: str, use_ocr: bool = True) -> School | None:
+    """
+    Parse a PDF given as a path on disk or as in-memory bytes.
+    Worker pools submit this directly; it lives in an importable module so it unpickles under spawn.
+    """
+    if isinstance(source, Path):
+        return school_from_pdf(source, use_ocr=use_ocr)
+    return school_from_pdf_stream(source, name, use_ocr)
+
+
+def _school_from_document(doc, pdf_path: Path, ocr_text: str | None = None, text_only: bool = False,
+                          use_ocr: bool = True) -> School | None:
+    """Parse the first page of an open PDF document into a School."""
+    try:
         page = doc[0]
+        # Parse the page text once and share it between the name, text-layer and fallback lookups.
+        # Dict flags keep image blocks so the school name stays at block 18.
+        textpage = page.get_textpage(flags=pymupdf.TEXTFLAGS_DICT)
     except Exception as e:
         print(f"[skip] {pdf_path.name}: cannot open/read first page ({e})")
         return None
@@ -352,7 +468,7 @@ def school_from_pdf(pdf_path: Path) -> School | None:
     # Extract school name from block 18 (original approach)
     school_name = "Unknown School"
     try:
-        page_dict = page.get_text("dict")
+        page_dict = page.get_text("dict", textpage=textpage)
         if page_dict and "blocks" in page_dict and len(page_dict["blocks"]) > 18:
             target_block = page_dict["blocks"][18]  # School name is in block 18
             
@@ -367,41 +483,51 @@ def school_from_pdf(pdf_path: Path) -> School | None:
     except Exception as e:
         print(f"[skip] {pdf_path.name}: cannot extract school name ({e})")
 
-    # Use OCR extraction (most reliable - reads visual content)
-    ocr_data = extract_data_from_ocr(str(pdf_path))
+    is_both = school_name in ES_AND_HS_SCHOOLS
+
+    # Fast path: born-digital reports carry a text layer, which parses without OCR
+    text_data, text_complete = extract_data_from_text_layer(page, textpage)
+    if text_complete:
+        if VERBOSE:
+            print(f"  [TEXT] Extracted data: {text_data}")
+        data = {m["label"]: text_data.get(m["label"]) for m in index_labels}
+        return School(school_name, is_both, data)
+    if text_only:
+        return None
+
+    # Use OCR extraction for scanned pages (reads visual content)
+    ocr_data = None
+    if use_ocr:
+        if VERBOSE:
+            print(f"  [OCR] No complete text layer, running OCR")
+        ocr_data = extract_data_from_ocr(page, ocr_text)
+    # A partial text layer still beats an OCR pass that found fewer fields (or OCR being off)
+    if text_data and (not ocr_data or len(text_data) >= len(ocr_data)):
+        if VERBOSE:
+            print(f"  [TEXT] Extracted partial data: {text_data}")
+        ocr_data = text_data
     if ocr_data and any(v is not None for v in ocr_data.values()):
         if VERBOSE:
             print(f"  [OCR] Extracted data: {ocr_data}")
-        is_both = school_name in es_and_hs_schools
-        target_field_list = []
-        for m in index_labels:
-            label = m["label"]
-            value = ocr_data.get(label)
-            target_field_list.append({"label": label, "value": value})
-        return School(school_name, is_both, target_field_list)
+        data = {m["label"]: ocr_data.get(m["label"]) for m in index_labels}
+        return School(school_name, is_both, data)
     
     try:
         if VERBOSE:
             print(f"  [FALLBACK] Using number-based parsing")
-        text = page.get_text()
-        numbers = re.findall(r"\d+", text)
-        numbers = [int(n) for n in numbers]
-        refined_numbers = numbers[37:]
+        text = page.get_text(textpage=textpage)
+        # Keep the digit tokens as strings and only convert the ones the index table picks out
+        refined_numbers = _NUM_RE.findall(text)[37:]
         
         if VERBOSE:
-            print(f"  [FALLBACK] Found {len(refined_numbers)} numbers: {refined_numbers[:10]}...")
+            print(f"  [FALLBACK] Found {len(refined_numbers)} numbers: {[int(n) for n in refined_numbers[:10]]}...")
         
-        target_field_list = []
-        for i in index_labels:
-            label = i["label"]
-            index = i["index_value"]
+        data = {}
+        for label, index in _FALLBACK_INDEXES:
             if index < len(refined_numbers):
-                value = refined_numbers[index]
-                field_object = {"label": label, "value": value}
-                target_field_list.append(field_object)
+                data[label] = int(refined_numbers[index])
         
-        is_both = school_name in es_and_hs_schools
-        return School(school_name, is_both, target_field_list)
+        return School(school_name, is_both, data)
         
     except Exception as e:
         print(f"[skip] {pdf_path.name}: both OCR and number-based parsing failed ({e})")
@@ -416,20 +542,24 @@ def build_rows_for_school(school):
     rows = []
 
     name = school.name
-    sub = _blank_if_zero(_get(school, "Sub"))
+    values = school.data
+    # Blank out zeros for every field in one pass (values are already numbers from the parsers);
+    # teacher counts are read from the raw values so a reported 0 is kept
+    blanked = {label: None if not v else v for label, v in values.items()}
+    sub = blanked.get("Sub")
 
-    k8_students = _blank_if_zero(_get(school, "SWD K-8"))
-    k8_teachers = _get(school, "IS K-8")
-    k8_oss = _blank_if_zero(_get(school, "OSS K-8"))
-    k8_ex = _blank_if_zero(_get(school, "EX K-8"))
+    k8_students = blanked.get("SWD K-8")
+    k8_teachers = values.get("IS K-8")
+    k8_oss = blanked.get("OSS K-8")
+    k8_ex = blanked.get("EX K-8")
 
-    hs_students = _blank_if_zero(_get(school, "SWD 9-12"))
-    hs_teachers = _get(school, "IS 9-12")
-    hs_oss = _blank_if_zero(_get(school, "OSS 9-12"))
-    hs_ex = _blank_if_zero(_get(school, "EX 9-12"))
+    hs_students = blanked.get("SWD 9-12")
+    hs_teachers = values.get("IS 9-12")
+    hs_oss = blanked.get("OSS 9-12")
+    hs_ex = blanked.get("EX 9-12")
 
-    er = _blank_if_zero(_get(school, "ER"))
-    mdm = _blank_if_zero(_get(school, "MDM"))
+    er = blanked.get("ER")
+    mdm = blanked.get("MDM")
     
     is_es = (k8_students is not None and k8_students > 0) or (k8_teachers is not None and k8_teachers > 0) or any(v is not None for v in [k8_oss, k8_ex])
     is_hs = (hs_students is not None and hs_students > 0) or (hs_teachers is not None and hs_teachers > 0) or any(v is not None for v in [hs_oss, hs_ex])
@@ -440,47 +570,80 @@ def build_rows_for_school(school):
     should_split = (school.is_both or (has_meaningful_es and has_meaningful_hs))
     
     if should_split:
-        rows.append({
-            "School": name + " ES", 
-            "Students": k8_students, "Teachers": k8_teachers, "Sub": sub,
-            "OSS": k8_oss, "EX": k8_ex, "ER": er, "MDM": mdm,
-        })
-        rows.append({
-            "School": name + " HS",
-            "Students": hs_students, "Teachers": hs_teachers, "Sub": sub,
-            "OSS": hs_oss, "EX": hs_ex, "ER": er, "MDM": mdm,
-        })
+        rows.append(Row(
+            School=name + " ES", 
+            Students=k8_students, Teachers=k8_teachers, Sub=sub,
+            OSS=k8_oss, EX=k8_ex, ER=er, MDM=mdm,
+        ))
+        rows.append(Row(
+            School=name + " HS",
+            Students=hs_students, Teachers=hs_teachers, Sub=sub,
+            OSS=hs_oss, EX=hs_ex, ER=er, MDM=mdm,
+        ))
     else:
         if is_es and not is_hs:
-            rows.append({
-                "School": name,
-                "Students": k8_students, "Teachers": k8_teachers, "Sub": sub,
-                "OSS": k8_oss, "EX": k8_ex, "ER": er, "MDM": mdm,
-            })
+            rows.append(Row(
+                School=name,
+                Students=k8_students, Teachers=k8_teachers, Sub=sub,
+                OSS=k8_oss, EX=k8_ex, ER=er, MDM=mdm,
+            ))
         elif is_hs and not is_es:
-            rows.append({
-                "School": name,
-                "Students": hs_students, "Teachers": hs_teachers, "Sub": sub,
-                "OSS": hs_oss, "EX": hs_ex, "ER": er, "MDM": mdm,
-            })
+            rows.append(Row(
+                School=name,
+                Students=hs_students, Teachers=hs_teachers, Sub=sub,
+                OSS=hs_oss, EX=hs_ex, ER=er, MDM=mdm,
+            ))
         elif is_es and is_hs:
-            rows.append({
-                "School": name,
-                "Students": k8_students, "Teachers": k8_teachers, "Sub": sub,
-                "OSS": k8_oss, "EX": k8_ex, "ER": er, "MDM": mdm,
-            })
+            rows.append(Row(
+                School=name,
+                Students=k8_students, Teachers=k8_teachers, Sub=sub,
+                OSS=k8_oss, EX=k8_ex, ER=er, MDM=mdm,
+            ))
         else:
-            rows.append({
-                "School": name,
-                "Students": None, "Teachers": None, "Sub": sub,
-                "OSS": None, "EX": None, "ER": er, "MDM": mdm,
-            })
+            rows.append(Row(
+                School=name,
+                Students=None, Teachers=None, Sub=sub,
+                OSS=None, EX=None, ER=er, MDM=mdm,
+            ))
     return rows
 
 
+def _process_pdf_batch(pdf_paths: list) -> list:
+    """
+    Worker entry point: OCR a batch of PDFs with one Tesseract run and parse each into a School.
+    Returns (pdf_path, school, error, needed_ocr) tuples so failures can be reported by the parent
+    process; needed_ocr marks PDFs without a complete text layer (sent to OCR or the number fallback).
+    """
+    # Text-layer PDFs are parsed in the same open that detects the text layer;
+    # the rest go through one Tesseract invocation to avoid per-file startup cost
+    parsed = {}
+    needs_ocr = []
+    for pdf_path in pdf_paths:
+        try:
+            school = school_from_pdf(pdf_path, text_only=True)
+        except Exception as e:
+            parsed[pdf_path] = (None, str(e))
+            continue
+        if school:
+            parsed[pdf_path] = (school, None)
+        else:
+            needs_ocr.append(pdf_path)
+    
+    ocr_texts = ocr_pdfs(needs_ocr) if needs_ocr else {}
+    for pdf_path in needs_ocr:
+        try:
+            parsed[pdf_path] = (school_from_pdf(pdf_path, ocr_texts.get(pdf_path)), None)
+        except Exception as e:
+            parsed[pdf_path] = (None, str(e))
+    
+    needs_ocr = set(needs_ocr)
+    return [(pdf_path, *parsed[pdf_path], pdf_path in needs_ocr) for pdf_path in pdf_paths]
+
+
 def bulk_run():
     """Process all PDFs in the files directory and generate Excel output."""
-    pdfs = list(FILES_DIR.glob("*.pdf"))
+    # One directory listing with a suffix check (also picks up ".PDF" files)
+    pdfs = sorted(p for p in FILES_DIR.iterdir() if p.suffix.lower() == ".pdf")
     if not pdfs:
         print("No PDF files found in files directory")
         return
@@ -490,37 +653,54 @@ def bulk_run():
     all_rows = []
     successful_pdfs = 0
     failed_pdfs = []
-    
-    for i, pdf_path in enumerate(pdfs, 1):
-        print(f"[{i}/{len(pdfs)}] Processing: {pdf_path.name}")
+    # PDFs that needed OCR or the number fallback, for diagnostics
+    ocr_fallbacks = 0
+    
+    # Each PDF is independent, so spread batches across worker processes.
+    # Several batches per worker keeps cores busy while still amortizing Tesseract startup.
+    workers = os.cpu_count() or 1
+    batch_size = max(1, math.ceil(len(pdfs) / (workers * 4)))
+    batches = [pdfs[i:i + batch_size] for i in range(0, len(pdfs), batch_size)]
+    # Don't start (and initialize) more workers than there are batches for small folders
+    workers = min(workers, len(batches))
+    
+    processed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker) as executor:
+        futures = {executor.submit(_process_pdf_batch, batch): batch for batch in batches}
         
-        try:
-            school = school_from_pdf(pdf_path)
-            if school:
-                rows = build_rows_for_school(school)
-                all_rows.extend(rows)
-                successful_pdfs += 1
-                print(f"  ✓ Success: {school.name} → {len(rows)} row(s)")
-            else:
-                failed_pdfs.append(pdf_path.name)
-                print(f"  ✗ Failed: Could not extract data")
-        except Exception as e:
-            failed_pdfs.append(f"{pdf_path.name} ({str(e)})")
-            print(f"  ✗ Error: {e}")
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [(pdf_path, None, str(e), False) for pdf_path in futures[future]]
+            
+            for pdf_path, school, error, needed_ocr in results:
+                processed += 1
+                ocr_fallbacks += needed_ocr
+                print(f"[{processed}/{len(pdfs)}] Processed: {pdf_path.name}")
+                
+                if error:
+                    failed_pdfs.append(f"{pdf_path.name} ({error})")
+                    print(f"  ✗ Error: {error}")
+                elif school:
+                    rows = build_rows_for_school(school)
+                    all_rows.extend(rows)
+                    successful_pdfs += 1
+                    print(f"  ✓ Success: {school.name} → {len(rows)} row(s)")
+                else:
+                    failed_pdfs.append(pdf_path.name)
+                    print(f"  ✗ Failed: Could not extract data")
     
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "School Data"
+    # Write-only mode streams rows out instead of building the full cell grid in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("School Data")
     
-    headers = ["School", "Students", "Teachers", "Sub", "OSS", "EX", "ER", "MDM"]
-    for col, header in enumerate(headers, 1):
-        ws.cell(row=1, column=col, value=header)
+    ws.append(COLUMNS)
     
-    all_rows.sort(key=lambda x: x.get("School", ""))
+    all_rows.sort(key=attrgetter("School"))
     
-    for row_idx, row_data in enumerate(all_rows, 2):
-        for col_idx, header in enumerate(headers, 1):
-            ws.cell(row=row_idx, column=col_idx, value=row_data.get(header))
+    for row_data in all_rows:
+        ws.append(row_data)
     
     out_path = get_versioned_output_path()
     wb.save(out_path)
@@ -532,6 +712,7 @@ def bulk_run():
     print(f"Total PDFs processed: {len(pdfs)}")
     print(f"Successful: {successful_pdfs}")
     print(f"Failed: {len(failed_pdfs)}")
+    print(f"Needed OCR/fallback (no complete text layer): {ocr_fallbacks}")
     print(f"Total rows generated: {len(all_rows)}")
     print(f"Output file: {out_path}")
     
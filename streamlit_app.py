@@ -5,10 +5,18 @@ import re
 import sys
 from datetime import datetime
 from pathlib import Path
-import tempfile
 import os
 import zipfile
 import random
+import hashlib
+import itertools
+import atexit
+import functools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 
 import pytesseract
 from PIL import Image
@@ -17,11 +25,40 @@ from openpyxl import Workbook, load_workbook
 
 # Import functions from main.py
 from main import (
-    School, COLUMNS, es_and_hs_schools, index_labels,
+    School, COLUMNS, ES_AND_HS_SCHOOLS, index_labels,
     _blank_if_zero, _get, apply_ocr_corrections, extract_data_from_ocr,
-    school_from_pdf, build_rows_for_school, get_versioned_output_path
+    school_from_pdf, school_from_source, build_rows_for_school,
+    get_versioned_output_path, _init_ocr_worker
 )
 
+# Below this many PDFs, worker startup costs more than parsing the files inline
+PARALLEL_MIN_FILES = 3
+
+# PDFs queued on the worker pool at once (about two per worker); the rest wait unread
+PARSES_IN_FLIGHT = 2 * (os.cpu_count() or 1)
+
+# Rows rendered in the results table before the "Show all" toggle is needed
+TABLE_PREVIEW_ROWS = 1000
+
+# Parsed Schools kept in the shared cache; the least recently used are dropped beyond this
+SCHOOL_CACHE_MAX_ENTRIES = 2000
+
+# Mimics Streamlit's UploadedFile for PDFs picked from a folder (source_path) or stored in an
+# uploaded ZIP (archive + member). Contents are only read on getbuffer(), which returns a
+# memoryview like the real UploadedFile.
+# eq=False keeps identity hashing, so instances can key dicts like real uploads.
+@dataclass(slots=True, eq=False)
+class MockUploadedFile:
+    name: str
+    source_path: Path | None = None
+    archive: zipfile.ZipFile | None = None
+    member: zipfile.ZipInfo | None = None
+    
+    def getbuffer(self):
+        if self.archive is not None:
+            return memoryview(self.archive.read(self.member))
+        return memoryview(self.source_path.read_bytes())
+
 # Page configuration
 st.set_page_config(
     page_title="OH SPED Monthly Report Scraper",
@@ -63,6 +100,22 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def _file_list_frame(files):
+    """Numbered table of file names for display."""
+    return pd.DataFrame({"#": range(1, len(files) + 1), "File": [f.name for f in files]})
+
+# Reruns reuse the listing until the folder changes; the directory's mtime moves whenever
+# an entry is added, removed or renamed, so it is part of the cache key
+@st.cache_data(show_spinner=False, max_entries=16)
+def _scan_folder(folder, mtime_ns):
+    """Sorted paths of the PDF files directly inside ``folder``."""
+    # One scandir pass; d_type avoids a stat per entry
+    with os.scandir(folder) as entries:
+        return sorted(
+            entry.path for entry in entries
+            if entry.name.lower().endswith('.pdf') and entry.is_file()
+        )
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">Ohio SPED Monthly Report Scraper</h1>', unsafe_allow_html=True)
@@ -75,7 +128,11 @@ def main():
         # Processing options
         st.subheader("Processing Options")
         verbose_mode = st.checkbox("Verbose Mode", help="Show detailed processing information")
-        use_ocr = st.checkbox("Use OCR Processing", value=True, help="Use OCR for better text extraction")
+        use_ocr = st.checkbox(
+            "Use OCR Processing", value=True,
+            help="Reports with a text layer are always read directly (Auto); "
+                 "this runs OCR on scanned reports that have none"
+        )
     
     # Main content area - Drag and Drop Upload (Primary Method)
     st.header("📤 Upload Files")
@@ -98,78 +155,39 @@ def main():
             name_lower = uf.name.lower()
             if name_lower.endswith('.zip'):
                 try:
-                    # Read ZIP file content
-                    # Convert memoryview to bytes, then to BytesIO
-                    zip_bytes = bytes(uf.getbuffer())
-                    zip_buffer = io.BytesIO(zip_bytes)
-                    zf = zipfile.ZipFile(zip_buffer)
+                    # UploadedFile is already a seekable file object, so read the ZIP
+                    # in place instead of copying the whole archive first
+                    uf.seek(0)
+                    zf = zipfile.ZipFile(uf)
                     
-                    # Count PDFs in ZIP, filtering out directories and duplicates
-                    # Use a set to track filenames we've already processed to avoid duplicates
-                    seen_filenames = set()
-                    pdf_members = []
-                    
-                    for member in zf.namelist():
-                        # Skip directories
-                        if member.endswith('/'):
-                            continue
-                        
-                        # Get just the filename (not the full path)
-                        filename = Path(member).name
-                        
-                        # Skip macOS resource fork files (start with ._)
-                        if filename.startswith('._'):
-                            continue
-                        
-                        # Skip other macOS system files
-                        if filename == '.DS_Store':
-                            continue
-                        
-                        # Only process PDF files
-                        if member.lower().endswith('.pdf'):
-                            # Only add if we haven't seen this filename before
-                            if filename not in seen_filenames:
-                                pdf_members.append(member)
-                                seen_filenames.add(filename)
+                    # Map each PDF's base name to its ZipInfo in one pass over the central directory,
+                    # skipping directories and macOS resource forks (._*); the first entry wins on duplicates
+                    pdf_members = {}
+                    for info in zf.infolist():
+                        filename = Path(info.filename).name
+                        if not info.is_dir() and filename.lower().endswith('.pdf') and not filename.startswith('._'):
+                            pdf_members.setdefault(filename, info)
                     
                     if not pdf_members:
                         st.warning(f"⚠️ {uf.name}: No PDF files found in ZIP")
                     else:
+                        # Members are decompressed lazily when processed; the open ZipFile is kept
+                        # by each entry, so reruns only rescan the central directory
                         extracted_count = 0
-                        for member in pdf_members:
-                            try:
-                                # Check if this is actually a file (not a directory)
-                                member_info = zf.getinfo(member)
-                                if member_info.is_dir():
-                                    continue
-                                
-                                pdf_bytes = zf.read(member)
-                                if len(pdf_bytes) == 0:
-                                    continue
-                                
-                                # Mimic Streamlit UploadedFile
-                                class MockUploadedFile:
-                                    def __init__(self, name, data_bytes):
-                                        self.name = name
-                                        self._data = data_bytes
-                                    def getbuffer(self):
-                                        return io.BytesIO(self._data)
-                                
-                                filename = Path(member).name
-                                expanded_files.append(
-                                    MockUploadedFile(filename, pdf_bytes)
-                                )
-                                extracted_count += 1
-                            except Exception as e:
-                                st.error(f"❌ Error extracting {member} from {uf.name}: {str(e)}")
+                        for filename, member_info in pdf_members.items():
+                            if member_info.file_size == 0:
+                                continue
+                            
+                            expanded_files.append(
+                                MockUploadedFile(filename, archive=zf, member=member_info)
+                            )
+                            extracted_count += 1
                         
                         if extracted_count > 0:
-                            st.success(f"✅ {uf.name}: Extracted {extracted_count} PDF file(s)")
+                            st.success(f"✅ {uf.name}: Found {extracted_count} PDF file(s)")
                         else:
                             st.warning(f"⚠️ {uf.name}: Could not extract any PDF files")
                     
-                    zf.close()
-                    
                 except zipfile.BadZipFile:
                     st.error(f"❌ {uf.name}: Invalid or corrupted ZIP file")
                 except Exception as e:
@@ -298,8 +316,8 @@ def main():
         if folder_path:
             folder_path = Path(folder_path)
             if folder_path.exists() and folder_path.is_dir():
-                # Find all PDF files in the folder
-                pdf_files = list(folder_path.glob("*.pdf"))
+                # Find all PDF files in the folder (only paths; nothing is read until processing)
+                pdf_files = [Path(p) for p in _scan_folder(str(folder_path), folder_path.stat().st_mtime_ns)]
                 if pdf_files:
                     st.success(f"✅ Found {len(pdf_files)} PDF files in: `{folder_path}`")
                     
@@ -310,25 +328,10 @@ def main():
                         if len(pdf_files) > 10:
                             st.write(f"... and {len(pdf_files) - 10} more files")
                     
-                    # Create file-like objects for each PDF
+                    # Create file-like objects for each PDF. They point at the file on disk,
+                    # so nothing is read until processing and the PDF is parsed in place.
                     for pdf_file in pdf_files:
-                        try:
-                            with open(pdf_file, 'rb') as f:
-                                file_data = f.read()
-                            
-                            # Create a file-like object that mimics uploaded file
-                            class MockUploadedFile:
-                                def __init__(self, name, data):
-                                    self.name = name
-                                    self._data = data
-                                
-                                def getbuffer(self):
-                                    return io.BytesIO(self._data)
-                            
-                            folder_uploaded_files.append(MockUploadedFile(pdf_file.name, file_data))
-                            
-                        except Exception as e:
-                            st.error(f"Error reading {pdf_file.name}: {e}")
+                        folder_uploaded_files.append(MockUploadedFile(pdf_file.name, source_path=pdf_file))
                     
                     # Store in session state (only if folder upload was used)
                     if folder_uploaded_files:
@@ -340,22 +343,23 @@ def main():
             else:
                 st.error(f"❌ Invalid path or folder does not exist: `{folder_path}`")
     
+    # Files queued for processing (set above by the uploader or the folder picker),
+    # read from session state once per rerun
+    uploaded_files = st.session_state.uploaded_files
+    file_count = len(uploaded_files)
+    
     # Main content area
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.header("📋 Processing Status")
         
-        # Get uploaded files from session state
-        uploaded_files = st.session_state.get('uploaded_files', [])
-        
         if uploaded_files:
-            st.success(f"✅ {len(uploaded_files)} file(s) ready for processing")
+            st.success(f"✅ {file_count} file(s) ready for processing")
             
-            # Show file names
-            with st.expander(f"📋 View {len(uploaded_files)} files to process"):
-                for i, file in enumerate(uploaded_files, 1):
-                    st.write(f"{i}. {file.name}")
+            # Show file names as one (client-side virtualized) table rather than one element per file
+            with st.expander(f"📋 View {file_count} files to process"):
+                st.dataframe(_file_list_frame(uploaded_files), height=300, hide_index=True, use_container_width=True)
             
             # Process files button
             if st.button("🚀 Process Files", type="primary", use_container_width=True):
@@ -367,36 +371,44 @@ def main():
         else:
             st.info("👆 Please drag and drop PDF files or a ZIP folder above to get started")
     
+    # Latest results, read after the Process Files button may have replaced them
+    processed_df = st.session_state.get('processed_df')
+    
     with col2:
         st.header("📊 Quick Stats")
         
         # Display stats if we have processed data
-        if 'processed_data' in st.session_state:
-            data = st.session_state.processed_data
-            st.metric("Schools Processed", len(data))
-            st.metric("Total Rows", len(data))
+        if processed_df is not None:
+            st.metric("Schools Processed", len(processed_df))
+            st.metric("Total Rows", len(processed_df))
             
             # Show sample data
-            if data:
+            if not processed_df.empty:
                 st.subheader("📋 Sample Data")
-                sample_df = pd.DataFrame(data[:5])
-                st.dataframe(sample_df, use_container_width=True)
+                st.dataframe(processed_df.head(5), use_container_width=True)
         else:
             st.info("No data processed yet")
     
+    # Results live in session_state, so they stay on screen across reruns
+    # (search box, download clicks) without rebuilding the table
+    if processed_df is not None:
+        display_results(
+            processed_df,
+            st.session_state.successful_files,
+            st.session_state.failed_files,
+            st.session_state.total_files
+        )
+    
     # Debug section (can be removed in production)
     if st.sidebar.checkbox("🐛 Show Debug Info"):
         st.sidebar.subheader("Debug Information")
-        st.sidebar.write(f"Uploaded files: {len(st.session_state.get('uploaded_files', []))}")
+        st.sidebar.write(f"Uploaded files: {file_count}")
         st.sidebar.write(f"Session state keys: {list(st.session_state.keys())}")
-        if 'uploaded_files' in st.session_state:
-            st.sidebar.write("File names:")
-            for file in st.session_state.uploaded_files:
-                st.sidebar.write(f"- {file.name}")
+        st.sidebar.write("File names:")
+        st.sidebar.dataframe(_file_list_frame(uploaded_files), height=300, hide_index=True)
         
         # Test processing with a single file
         if st.sidebar.button("🧪 Test Single File Processing"):
-            uploaded_files = st.session_state.get('uploaded_files', [])
             if uploaded_files:
                 st.sidebar.write("Testing with first file...")
                 try:
@@ -404,8 +416,8 @@ def main():
                     st.sidebar.write(f"Testing: {test_file.name}")
                     
                     # Test if we can read the file
-                    file_data = bytes(test_file.getbuffer())
-                    st.sidebar.write(f"File size: {len(file_data)} bytes")
+                    file_data = test_file.getbuffer()
+                    st.sidebar.write(f"File size: {file_data.nbytes} bytes")
                     
                     # Test if main.py functions are importable
                     try:
@@ -437,6 +449,104 @@ def main():
                 st.sidebar.error(f"Test failed: {e}")
                 st.sidebar.exception(e)
 
+@st.cache_resource
+def _school_cache():
+    """
+    Parsed Schools keyed by (PDF content hash, use_ocr), shared across reruns and sessions.
+    Kept in least-recently-used order and bounded by SCHOOL_CACHE_MAX_ENTRIES; guarded by
+    _school_cache_lock() because sessions run on separate threads.
+    """
+    return OrderedDict()
+
+@st.cache_resource
+def _school_cache_lock():
+    return threading.Lock()
+
+def _cached_school(cache_key):
+    """Return the cached School for cache_key (marking it recently used), or None."""
+    school_cache = _school_cache()
+    with _school_cache_lock():
+        school = school_cache.get(cache_key)
+        if school is not None:
+            school_cache.move_to_end(cache_key)
+        return school
+
+def _cache_school(cache_key, school):
+    """Store a parsed School, evicting the least recently used entries past the bound."""
+    school_cache = _school_cache()
+    with _school_cache_lock():
+        school_cache[cache_key] = school
+        school_cache.move_to_end(cache_key)
+        while len(school_cache) > SCHOOL_CACHE_MAX_ENTRIES:
+            school_cache.popitem(last=False)
+
+@st.cache_resource
+def _pdf_executor():
+    """
+    Worker pool kept alive across reruns and "Process Files" clicks, so workers only pay
+    the imports and Tesseract probe (_init_ocr_worker) once.
+    """
+    executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, initializer=_init_ocr_worker)
+    atexit.register(executor.shutdown, wait=False, cancel_futures=True)
+    return executor
+
+def _pdf_source(uploaded_file):
+    """
+    What school_from_source parses for an upload: the path for files picked from a folder,
+    otherwise the PDF's bytes. Called only when the PDF is about to be parsed.
+    """
+    source_path = getattr(uploaded_file, "source_path", None)
+    if source_path:
+        return source_path
+    buffer = uploaded_file.getbuffer()
+    # ZIP members already sit in their own bytes object; only Streamlit's
+    # BytesIO-backed uploads need copying out (worker processes need bytes)
+    return buffer.obj if type(buffer.obj) is bytes else bytes(buffer)
+
+def _parse_pending_pdfs(pending_files, use_ocr):
+    """
+    Parse uploaded files into Schools, yielding (uploaded_file, school, error) as each PDF finishes.
+    Larger uploads are spread across worker processes; small ones run inline to skip pool startup.
+    Each PDF's bytes are read only when it is parsed or handed to a worker, and only
+    PARSES_IN_FLIGHT PDFs are queued on the pool at once, so memory holds a few PDFs, not the batch.
+    """
+    if len(pending_files) < PARALLEL_MIN_FILES:
+        for uploaded_file in pending_files:
+            try:
+                yield uploaded_file, school_from_source(_pdf_source(uploaded_file), uploaded_file.name, use_ocr), None
+            except Exception as e:
+                yield uploaded_file, None, e
+        return
+    
+    executor = _pdf_executor()
+    remaining = iter(pending_files)
+    futures = {}
+    while True:
+        # Top the pool back up; the loop resumes where the previous top-up stopped
+        for uploaded_file in remaining:
+            try:
+                future = executor.submit(school_from_source, _pdf_source(uploaded_file), uploaded_file.name, use_ocr)
+            except Exception as e:
+                yield uploaded_file, None, e
+                continue
+            futures[future] = uploaded_file
+            if len(futures) >= PARSES_IN_FLIGHT:
+                break
+        if not futures:
+            return
+        
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            uploaded_file = futures.pop(future)
+            try:
+                yield uploaded_file, future.result(), None
+            except BrokenProcessPool as e:
+                # A worker died; start a fresh pool on the next run instead of reusing the broken one
+                _pdf_executor.clear()
+                yield uploaded_file, None, e
+            except Exception as e:
+                yield uploaded_file, None, e
+
 def process_files(uploaded_files, verbose_mode, use_ocr):
     """Process uploaded PDF files and extract school data."""
     
@@ -471,7 +581,8 @@ def process_files(uploaded_files, verbose_mode, use_ocr):
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    all_rows = []
+    # Rows are gathered column by column so the DataFrame is built from one list per column
+    columns = {column: [] for column in COLUMNS}
     successful_files = 0
     failed_files = []
     
@@ -479,60 +590,70 @@ def process_files(uploaded_files, verbose_mode, use_ocr):
     st.info(f"🚀 Starting to process {len(uploaded_files)} file(s)...")
     
     try:
-        # Create temporary directory for processing
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            
-            for i, uploaded_file in enumerate(uploaded_files):
-                # Update progress
-                progress = (i + 1) / len(uploaded_files)
-                progress_bar.progress(progress)
-                status_text.text(f"Processing {uploaded_file.name}...")
+        # Hash every upload first so PDFs already parsed (same content hash) are served from the
+        # school cache; the rest are kept as handles and read again when they are parsed.
+        cached_results = []
+        pending_files = []
+        cache_keys = {}
+        for uploaded_file in uploaded_files:
+            try:
+                # Real and mock uploads both hand back a memoryview, so hashing reads the bytes in place.
+                # Results depend on the OCR setting, so it is part of the cache key.
+                digest = hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).hexdigest()
+                cache_key = (digest, use_ocr)
+                school = _cached_school(cache_key)
+                if school is not None:
+                    cached_results.append((uploaded_file, school, None))
+                    continue
+                cache_keys[uploaded_file] = cache_key
+                pending_files.append(uploaded_file)
                 
-                try:
-                    # Save uploaded file to temporary location
-                    temp_pdf_path = temp_path / uploaded_file.name
-                    with open(temp_pdf_path, "wb") as f:
-                        # Handle both real UploadedFile (memoryview) and MockUploadedFile (BytesIO)
-                        buffer = uploaded_file.getbuffer()
-                        if isinstance(buffer, io.BytesIO):
-                            # MockUploadedFile returns BytesIO
-                            f.write(buffer.getvalue())
-                        else:
-                            # Real UploadedFile returns memoryview
-                            f.write(bytes(buffer))
-                    
-                    # Check if file was saved correctly
-                    if not temp_pdf_path.exists():
-                        raise Exception(f"Failed to save file: {uploaded_file.name}")
-                    
-                    if verbose_mode:
-                        st.write(f"📄 Processing: {uploaded_file.name}")
-                    
-                    # Process the PDF
-                    school = school_from_pdf(temp_pdf_path)
-                    
-                    if school:
-                        rows = build_rows_for_school(school)
-                        all_rows.extend(rows)
-                        successful_files += 1
-                        
-                        if verbose_mode:
-                            st.success(f"✅ {school.name}: {len(rows)} row(s) extracted")
-                        else:
-                            st.success(f"✅ {uploaded_file.name}: {len(rows)} row(s)")
-                    else:
-                        failed_files.append(uploaded_file.name)
-                        st.error(f"❌ Failed to extract data from {uploaded_file.name}")
-                        
-                except Exception as e:
-                    failed_files.append(f"{uploaded_file.name} ({str(e)})")
-                    st.error(f"❌ Error processing {uploaded_file.name}: {e}")
-                    if verbose_mode:
-                        st.exception(e)  # Show full traceback in verbose mode
-                    else:
-                        st.info("💡 Enable 'Verbose Mode' in sidebar to see detailed error information")
-    
+            except Exception as e:
+                failed_files.append(f"{uploaded_file.name} ({str(e)})")
+                st.error(f"❌ Error reading {uploaded_file.name}: {e}")
+                if verbose_mode:
+                    st.exception(e)
+        
+        total = len(cached_results) + len(pending_files)
+        results = itertools.chain(cached_results, _parse_pending_pdfs(pending_files, use_ocr))
+        
+        # Per-file outcomes are collected and rendered once as a table after the loop;
+        # only the progress bar and status line update while files are processed
+        outcomes = []
+        had_errors = False
+        for i, (uploaded_file, school, error) in enumerate(results):
+            # Update progress
+            progress = (i + 1) / total
+            progress_bar.progress(progress)
+            status_text.text(f"Processed {uploaded_file.name}")
+            
+            if error:
+                failed_files.append(f"{uploaded_file.name} ({str(error)})")
+                outcomes.append((uploaded_file.name, f"❌ Error: {error}", 0))
+                had_errors = True
+                if verbose_mode:
+                    st.exception(error)  # Show full traceback in verbose mode
+            elif school:
+                if uploaded_file in cache_keys:
+                    _cache_school(cache_keys[uploaded_file], school)
+                rows = build_rows_for_school(school)
+                for column, values in zip(columns.values(), zip(*rows)):
+                    column.extend(values)
+                successful_files += 1
+                outcomes.append((uploaded_file.name, f"✅ {school.name}" if verbose_mode else "✅ Success", len(rows)))
+            else:
+                failed_files.append(uploaded_file.name)
+                outcomes.append((uploaded_file.name, "❌ Failed to extract data", 0))
+        
+        if outcomes:
+            st.dataframe(
+                pd.DataFrame(outcomes, columns=["File", "Status", "Rows"]),
+                hide_index=True, use_container_width=True
+            )
+        
+        if had_errors and not verbose_mode:
+            st.info("💡 Enable 'Verbose Mode' in sidebar to see detailed error information")
+
     except Exception as e:
         gif_container.empty()
         st.error(f"❌ Critical error during processing: {e}")
@@ -547,15 +668,45 @@ def process_files(uploaded_files, verbose_mode, use_ocr):
     # Clear loading GIF
     gif_container.empty()
     
-    # Store results in session state
-    st.session_state.processed_data = all_rows
+    # Build the results table once. Arrow-backed columns keep the sort and search on Arrow's
+    # string kernels and let st.dataframe hand the columns to the browser without conversion.
+    df = pd.DataFrame(columns).convert_dtypes(dtype_backend='pyarrow')
+    df = df.sort_values('School', kind='stable').reset_index(drop=True)
+    
+    # Store results in session state; main() displays them from there on every rerun
+    st.session_state.processed_df = df
     st.session_state.successful_files = successful_files
     st.session_state.failed_files = failed_files
-    
-    # Display results
-    display_results(all_rows, successful_files, failed_files, len(uploaded_files))
+    st.session_state.total_files = len(uploaded_files)
+
+# Downloads are serialized once per distinct table; reruns (search box, toggles) reuse the bytes
+@st.cache_data(show_spinner=False)
+def _excel_bytes(df):
+    """
+    Serialize the results table to .xlsx bytes.
+    Uses an openpyxl write-only workbook, which streams rows out instead of building
+    the full cell model that pd.ExcelWriter does.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('School Data')
+    ws.append(list(df.columns))
+    # Missing values become empty cells, matching df.to_excel
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+        ws.append(row)
+    
+    excel_buffer = io.BytesIO()
+    wb.save(excel_buffer)
+    return excel_buffer.getvalue()
+
+@st.cache_data(show_spinner=False)
+def _csv_bytes(df):
+    """Serialize the results table to CSV bytes."""
+    return df.to_csv(index=False).encode('utf-8')
 
-def display_results(all_rows, successful_files, failed_files, total_files):
+# The search box, "Show all" toggle and download buttons only affect this section,
+# so their interactions rerun the fragment instead of the whole app
+@st.fragment
+def display_results(df, successful_files, failed_files, total_files):
     """Display processing results and provide download options."""
     
     st.markdown("---")
@@ -571,52 +722,48 @@ def display_results(all_rows, successful_files, failed_files, total_files):
     with col3:
         st.metric("Failed", len(failed_files))
     with col4:
-        st.metric("Total Rows", len(all_rows))
+        st.metric("Total Rows", len(df))
     
     # Display data table
-    if all_rows:
+    if not df.empty:
         st.subheader("📋 Extracted Data")
         
-        # Create DataFrame
-        df = pd.DataFrame(all_rows)
-        df = df.sort_values('School')
-        
-        # Display with search and filtering
+        # Display with search and filtering (plain substring match, so names like "St. Mary (K-8)" search literally)
         search_term = st.text_input("🔍 Search schools:", placeholder="Enter school name...")
+        total_rows = len(df)
         if search_term:
-            df = df[df['School'].str.contains(search_term, case=False, na=False)]
+            df = df[df['School'].str.contains(search_term, case=False, regex=False, na=False)]
         
-        # Show the data
-        st.dataframe(df, use_container_width=True)
+        # Show the data; very large tables only send the first rows unless asked for all of them.
+        # The toggle has a fixed key and is shown based on the unfiltered size, so searching keeps its state.
+        show_all = total_rows <= TABLE_PREVIEW_ROWS or st.toggle("Show all rows", key="show_all_rows")
+        if len(df) > TABLE_PREVIEW_ROWS and not show_all:
+            st.dataframe(df.head(TABLE_PREVIEW_ROWS), use_container_width=True)
+            st.caption(f"Showing the first {TABLE_PREVIEW_ROWS} of {len(df)} rows")
+        else:
+            st.dataframe(df, use_container_width=True)
         
         # Download options
         st.subheader("💾 Download Options")
         
         col1, col2 = st.columns(2)
         
+        # Files are only serialized when their button is clicked (Streamlit runs the callable on a
+        # separate thread), so rendering results never waits on either export
         with col1:
             # Excel download
-            excel_buffer = io.BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='School Data', index=False)
-            excel_buffer.seek(0)
-            
             st.download_button(
                 label="📊 Download Excel File",
-                data=excel_buffer.getvalue(),
+                data=functools.partial(_excel_bytes, df),
                 file_name=f"monthly_report_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
         
         with col2:
             # CSV download
-            csv_buffer = io.StringIO()
-            df.to_csv(csv_buffer, index=False)
-            csv_buffer.seek(0)
-            
             st.download_button(
                 label="📄 Download CSV File",
-                data=csv_buffer.getvalue(),
+                data=functools.partial(_csv_bytes, df),
                 file_name=f"monthly_report_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv"
             )
@@ -624,24 +771,25 @@ def display_results(all_rows, successful_files, failed_files, total_files):
         # Data visualization
         st.subheader("📊 Data Visualization")
         
-        # Create visualizations
+        # Create visualizations: index by school once and build one mask for both charts
+        # (missing values compare as NA, which counts as not positive)
+        chart_data = df.set_index('School')[['Students', 'Teachers']]
+        positive = chart_data.gt(0).fillna(False)
         viz_col1, viz_col2 = st.columns(2)
         
         with viz_col1:
             # Students by school
-            if 'Students' in df.columns:
-                students_data = df[df['Students'].notna() & (df['Students'] > 0)]
-                if not students_data.empty:
-                    st.bar_chart(students_data.set_index('School')['Students'])
-                    st.caption("Students by School")
+            students_data = chart_data['Students'][positive['Students']]
+            if not students_data.empty:
+                st.bar_chart(students_data)
+                st.caption("Students by School")
         
         with viz_col2:
             # Teachers by school
-            if 'Teachers' in df.columns:
-                teachers_data = df[df['Teachers'].notna() & (df['Teachers'] > 0)]
-                if not teachers_data.empty:
-                    st.bar_chart(teachers_data.set_index('School')['Teachers'])
-                    st.caption("Teachers by School")
+            teachers_data = chart_data['Teachers'][positive['Teachers']]
+            if not teachers_data.empty:
+                st.bar_chart(teachers_data)
+                st.caption("Teachers by School")
     
     # Show failed files if any
     if failed_files:
@@ -659,7 +807,7 @@ def show_help():
     1. **Upload Files**: Use the sidebar to upload one or more PDF files containing school monthly reports
     2. **Configure Options**: 
        - Enable "Verbose Mode" for detailed processing information
-       - Enable "Use OCR Processing" for better text extraction
+       - Enable "Use OCR Processing" to read scanned reports (reports with a text layer never need OCR)
     3. **Process Files**: Click the "Process Files" button to extract data
     4. **View Results**: Review the extracted data in the table
     5. **Download Data**: Use the download buttons to save results as Excel or CSV